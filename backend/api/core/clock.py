@@ -0,0 +1,40 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Iterator, Optional
+
+_request_now: ContextVar[Optional[datetime]] = ContextVar("request_now", default=None)
+
+def utcnow() -> datetime:
+    """
+    Current UTC time. Inside a request (or a frozen_utcnow() block) this is
+    the timestamp captured when it started, so bulk model construction reads
+    the clock once instead of once per field.
+    """
+    now = _request_now.get()
+    return now if now is not None else datetime.utcnow()
+
+@contextmanager
+def frozen_utcnow() -> Iterator[datetime]:
+    """Freeze utcnow() for the duration of the block (e.g. batch inserts)"""
+    now = datetime.utcnow()
+    token = _request_now.set(now)
+    try:
+        yield now
+    finally:
+        _request_now.reset(token)
+
+class RequestClockMiddleware:
+    """Pure ASGI middleware that captures one timestamp per request (also exposed as request.state.now)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with frozen_utcnow() as now:
+            scope.setdefault("state", {})["now"] = now
+            await self.app(scope, receive, send)
@@ -1,6 +1,7 @@
 import os
+from datetime import timedelta
 from typing import List
-from pydantic import BaseSettings, validator
+from pydantic import BaseSettings, root_validator, validator
 
 class Settings(BaseSettings):
     # API settings
@@ -8,6 +9,9 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "Smart Contract Intelligence Platform"
     DEBUG: bool = os.getenv("DEBUG", "False").lower() in ("true", "1", "t")
     PORT: int = int(os.getenv("PORT", "8000"))
+    WORKERS: int = int(os.getenv("UVICORN_WORKERS", "1"))
+    # Skip the OpenAPI schema and docs routes (e.g. for serverless cold starts)
+    DISABLE_OPENAPI: bool = os.getenv("DISABLE_OPENAPI", "False").lower() in ("true", "1", "t")
 
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-for-development-only")
@@ -27,12 +31,36 @@ class Settings(BaseSettings):
 
     # AI Service
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
+    OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4-turbo")
+    # Completion-token ceiling of OPENAI_MODEL; requests asking for more are rejected
+    OPENAI_MAX_COMPLETION_TOKENS: int = int(os.getenv("OPENAI_MAX_COMPLETION_TOKENS", "4096"))
+    # Seconds to wait for a completion's response; long generations need minutes (SDK default: 600)
+    OPENAI_READ_TIMEOUT: float = float(os.getenv("OPENAI_READ_TIMEOUT", "600"))
+    # Attempts per single completion call; 429s, 5xx and connection errors are retried
+    OPENAI_MAX_ATTEMPTS: int = int(os.getenv("OPENAI_MAX_ATTEMPTS", "3"))
+    # Throttles for bulk (validate_many / analyze_many) requests
+    OPENAI_MAX_REQUESTS_PER_MINUTE: int = int(os.getenv("OPENAI_MAX_REQUESTS_PER_MINUTE", "500"))
+    OPENAI_MAX_TOKENS_PER_MINUTE: int = int(os.getenv("OPENAI_MAX_TOKENS_PER_MINUTE", "30000"))
+    # Self-hosted SGLang server (OpenAI-compatible API) for schema-constrained structure extraction
+    SGLANG_URL: str = os.getenv("SGLANG_URL", "http://localhost:30000")
+    SGLANG_MODEL: str = os.getenv("SGLANG_MODEL", "default")
+    SGLANG_API_KEY: str = os.getenv("SGLANG_API_KEY", "")
 
     # Blockchain Service
     BLOCKCHAIN_SERVICE_URL: str = os.getenv("BLOCKCHAIN_SERVICE_URL", "http://localhost:8080")
     ETH_RPC_URL: str = os.getenv("ETH_RPC_URL", "https://mainnet.infura.io/v3/your-infura-key")
     ETH_CHAIN_ID: int = int(os.getenv("ETH_CHAIN_ID", "1"))  # Mainnet by default
 
+    # Derived from the settings above once at startup instead of on every request
+    access_token_expire_delta: timedelta = None
+    secret_key_bytes: bytes = None
+
+    @root_validator(skip_on_failure=True)
+    def derive_token_settings(cls, values):
+        values["access_token_expire_delta"] = timedelta(minutes=values["ACCESS_TOKEN_EXPIRE_MINUTES"])
+        values["secret_key_bytes"] = values["SECRET_KEY"].encode()
+        return values
+
     class Config:
         case_sensitive = True
         env_file = ".env"
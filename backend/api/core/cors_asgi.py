@@ -0,0 +1,95 @@
+from typing import Iterable, List, Tuple
+
+# Matches what Starlette expands allow_methods=["*"] to. Browsers ignore the
+# "*" wildcard on credentialed requests, so methods must be listed explicitly.
+ALL_METHODS = ("DELETE", "GET", "HEAD", "OPTIONS", "PATCH", "POST", "PUT")
+
+
+class FastCORS:
+    """
+    Pure ASGI CORS middleware for a fixed origin list that allows all methods
+    and headers with credentials. Every header value is encoded once at startup,
+    so per-request work is a single scan of the raw request headers.
+    """
+
+    def __init__(
+            self,
+            app,
+            origins: Iterable[str],
+            allow_credentials: bool = True,
+            max_age: int = 600
+    ):
+        self.app = app
+        self._origin_set = frozenset(origin.encode("latin-1") for origin in origins)
+        self._allow_all_origins = b"*" in self._origin_set
+
+        self._simple_headers: List[Tuple[bytes, bytes]] = [(b"vary", b"Origin")]
+        self._preflight_headers: List[Tuple[bytes, bytes]] = [
+            (b"vary", b"Origin"),
+            (b"access-control-allow-methods", ", ".join(ALL_METHODS).encode("latin-1")),
+            (b"access-control-max-age", str(max_age).encode("latin-1")),
+        ]
+        if allow_credentials:
+            self._simple_headers.append((b"access-control-allow-credentials", b"true"))
+            self._preflight_headers.append((b"access-control-allow-credentials", b"true"))
+
+    def _is_allowed_origin(self, origin: bytes) -> bool:
+        return self._allow_all_origins or origin in self._origin_set
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        request_method = None
+        request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        allowed = self._is_allowed_origin(origin)
+
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            await self._preflight(send, origin, allowed, request_headers)
+            return
+
+        if not allowed:
+            await self.app(scope, receive, send)
+            return
+
+        response_headers = [(b"access-control-allow-origin", origin), *self._simple_headers]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *response_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _preflight(self, send, origin: bytes, allowed: bool, request_headers):
+        headers = list(self._preflight_headers)
+
+        if not allowed:
+            body = b"Disallowed CORS origin"
+            headers.append((b"content-type", b"text/plain; charset=utf-8"))
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            await send({"type": "http.response.start", "status": 400, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        headers.append((b"access-control-allow-origin", origin))
+        # All headers are allowed, so mirror back whatever the browser asked for
+        if request_headers is not None:
+            headers.append((b"access-control-allow-headers", request_headers))
+
+        await send({"type": "http.response.start", "status": 204, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
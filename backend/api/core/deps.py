@@ -0,0 +1,16 @@
+from fastapi import Request
+from api.services.ai_service import AIService
+from api.services.blockchain import BlockchainService
+from api.services.visualisation import VisualizationService
+
+# Services are created once at startup (see api.main) and shared by every
+# request, so their HTTP clients and connection pools are reused.
+
+def get_ai_service(request: Request) -> AIService:
+    return request.app.state.ai_service
+
+def get_blockchain_service(request: Request) -> BlockchainService:
+    return request.app.state.blockchain_service
+
+def get_visualization_service(request: Request) -> VisualizationService:
+    return request.app.state.visualization_service
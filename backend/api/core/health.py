@@ -0,0 +1,30 @@
+import orjson
+
+_HEALTH_BODY = orjson.dumps({"status": "healthy", "service": "smart-contract-intelligence-api"})
+
+_HEALTH_HEADERS = [
+    (b"content-type", b"application/json"),
+    (b"content-length", str(len(_HEALTH_BODY)).encode("latin-1")),
+]
+
+class HealthCheckMiddleware:
+    """
+    Pure ASGI middleware that answers liveness probes on GET / directly,
+    before CORS, routing and auth ever run.
+    """
+
+    def __init__(self, app, path: str = "/"):
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if (
+                scope["type"] == "http"
+                and scope["path"] == self.path
+                and scope["method"] in ("GET", "HEAD")
+        ):
+            await send({"type": "http.response.start", "status": 200, "headers": _HEALTH_HEADERS})
+            await send({"type": "http.response.body", "body": _HEALTH_BODY if scope["method"] == "GET" else b""})
+            return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,73 @@
+import re
+from typing import Any
+import orjson
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.S)
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_LITERAL_RE = re.compile(r"\b(True|False|None)\b")
+
+def _strip_fences(text: str) -> str:
+    match = _FENCE_RE.search(text)
+    return match.group(1) if match else text
+
+def _outermost_value(text: str) -> str:
+    """Trim any prose around the first JSON object/array in the text"""
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text
+    start = min(starts)
+    end = text.rfind("}" if text[start] == "{" else "]")
+    return text[start:end + 1] if end > start else text[start:]
+
+def _fix_tokens(text: str) -> str:
+    """
+    Outside of string literals, drop trailing commas before a closing bracket
+    and turn Python's True/False/None into JSON literals.
+    """
+    out = []
+    segment_start = 0
+    in_string = False
+    escaped = False
+
+    def flush_code(end: int):
+        out.append(_LITERAL_RE.sub(lambda m: _PYTHON_LITERALS[m.group(1)], text[segment_start:end]))
+
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                out.append(text[segment_start:i + 1])
+                segment_start = i + 1
+        elif char == '"':
+            flush_code(i)
+            segment_start = i
+            in_string = True
+        elif char in "}]":
+            flush_code(i)
+            segment_start = i
+            # Drop a trailing comma (and whitespace after it) before the closing bracket
+            tail = out[-1].rstrip()
+            if tail.endswith(","):
+                out[-1] = tail[:-1]
+
+    if in_string:
+        out.append(text[segment_start:])
+    else:
+        flush_code(len(text))
+    return "".join(out)
+
+def loads_lenient(text: str) -> Any:
+    """
+    Parse JSON from an LLM reply, repairing the usual slips: markdown code
+    fences, prose around the object, trailing commas and Python literals.
+    Raises ValueError if the text still isn't valid JSON after repair.
+    """
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        pass
+    return orjson.loads(_fix_tokens(_outermost_value(_strip_fences(text))))
\ No newline at end of file
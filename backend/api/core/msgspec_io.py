@@ -0,0 +1,62 @@
+from typing import Any, Callable, Dict, Type, TypeVar
+import msgspec
+from fastapi import HTTPException, Request, status
+from fastapi.responses import Response
+
+T = TypeVar("T")
+
+_encoder = msgspec.json.Encoder()
+
+class MsgspecResponse(Response):
+    """JSON response for msgspec Structs (and plain builtins), encoded without pydantic"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return _encoder.encode(content)
+
+def msgspec_schema(model: Any) -> Dict[str, Any]:
+    """JSON schema for a msgspec type, with nested Struct definitions inlined"""
+    (schema,), components = msgspec.json.schema_components([model], ref_template="{name}")
+
+    def inline(node: Any) -> Any:
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return inline(components[node["$ref"]])
+            return {key: inline(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [inline(value) for value in node]
+        return node
+
+    return inline(schema)
+
+def msgspec_request_body(model: Any) -> Dict[str, Any]:
+    """`openapi_extra` documenting a request body read through msgspec_body"""
+    return {"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": msgspec_schema(model)}}
+    }}
+
+def msgspec_responses(model: Any) -> Dict[int, Any]:
+    """`responses` documenting a route that returns a MsgspecResponse of `model`"""
+    return {200: {"content": {"application/json": {"schema": msgspec_schema(model)}}}}
+
+def msgspec_body(model: Type[T]) -> Callable[[Request], Any]:
+    """
+    Build a dependency that decodes and validates the raw request body
+    straight into a msgspec Struct, bypassing FastAPI's pydantic body parsing.
+    Decoding is strict: unlike pydantic, values of the wrong JSON type (e.g. a
+    number for a str field) are rejected with 422 rather than coerced.
+    Document the body on the route with openapi_extra=msgspec_request_body(model).
+    """
+    decoder = msgspec.json.Decoder(model)
+
+    async def dependency(request: Request) -> T:
+        try:
+            return decoder.decode(await request.body())
+        except (msgspec.ValidationError, msgspec.DecodeError) as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=str(e)
+            )
+
+    return dependency
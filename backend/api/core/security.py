@@ -1,30 +1,84 @@
+import asyncio
+import hmac
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+import jwt
+from jwt import PyJWTError
 from passlib.context import CryptContext
+from api.core.clock import utcnow
 from api.core.config import settings
+from api.core.ttl_cache import TTLCache
 from api.schemas.user import TokenData, User
 
 # Security configurations
+# User passwords keep passlib's default bcrypt cost. High-entropy secrets such as
+# API or refresh tokens cannot be brute-forced, so they use a much cheaper context.
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+token_pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=6)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/users/token")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+# PyJWT signs with the stdlib's C-level hmac; the key is the pre-encoded secret
+ALGORITHM = "HS256"
+
+# bcrypt is CPU-bound; run it off the event loop so other requests keep flowing
+_bcrypt_pool = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="bcrypt")
+
+# Successful bcrypt verifications, keyed by HMAC(password, hash).
+# Only positive results are cached so failed attempts always pay the full cost.
+_VERIFY_CACHE_MAX_SIZE = 4096
+_VERIFY_CACHE_TTL = 300  # seconds
+_verify_cache: "TTLCache[bytes, bool]" = TTLCache(_VERIFY_CACHE_MAX_SIZE, _VERIFY_CACHE_TTL)
+
+# Decoded bearer tokens: token -> User. An entry lives for at
+# most _TOKEN_CACHE_TTL seconds and never past the token's own "exp" claim.
+_TOKEN_CACHE_MAX_SIZE = 10_000
+_TOKEN_CACHE_TTL = 60  # seconds
+_token_cache: "TTLCache[str, User]" = TTLCache(_TOKEN_CACHE_MAX_SIZE, _TOKEN_CACHE_TTL)
+
+def _verify_cache_key(plain_password: str, hashed_password: str) -> bytes:
+    return hmac.new(
+        settings.secret_key_bytes,
+        plain_password.encode() + b"|" + hashed_password.encode(),
+        "sha256"
+    ).digest()
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    key = _verify_cache_key(plain_password, hashed_password)
+    if _verify_cache.get(key):
+        return True
+
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(_bcrypt_pool, pwd_context.verify, plain_password, hashed_password):
+        return False
 
-def get_password_hash(password: str) -> str:
+    _verify_cache.set(key, True)
+    return True
+
+async def get_password_hash(password: str) -> str:
     """Hash a password for storing"""
-    return pwd_context.hash(password)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_bcrypt_pool, pwd_context.hash, password)
+
+def verify_token(plain_token: str, hashed_token: str) -> bool:
+    """Verify an opaque token (API key, refresh token) against its hash"""
+    return token_pwd_context.verify(plain_token, hashed_token)
+
+def hash_token(token: str) -> str:
+    """Hash an opaque token for storing"""
+    return token_pwd_context.hash(token)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a new JWT token"""
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+    expire = datetime.utcnow() + (expires_delta or settings.access_token_expire_delta)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
+    encoded_jwt = jwt.encode(to_encode, settings.secret_key_bytes, algorithm=ALGORITHM)
     return encoded_jwt
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
@@ -35,28 +89,37 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+    cached = _token_cache.get(token)
+    if cached is not None:
+        return cached
+
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        payload = jwt.decode(token, settings.secret_key_bytes, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
         token_data = TokenData(user_id=user_id)
-    except JWTError:
+        ttl = float(_TOKEN_CACHE_TTL)
+        if "exp" in payload:
+            ttl = min(ttl, float(payload["exp"]) - time.time())
+    except PyJWTError:
         raise credentials_exception
 
     # In a real implementation, you would fetch the user from the database here
-    # For now, we'll create a sample user
-    user = User(
+    # For now, we'll create a sample user. The values are trusted, so skip validation
+    user = User.construct(
         id=token_data.user_id,
         email="user@example.com",
         username="testuser",
         full_name="Test User",
         is_active=True,
-        created_at=datetime.utcnow(),
+        created_at=utcnow(),
         wallet_address="0x123456789abcdef"
     )
 
     if user is None:
         raise credentials_exception
 
+    _token_cache.set(token, user, ttl=ttl)
+
     return user
\ No newline at end of file
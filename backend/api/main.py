@@ -1,32 +1,59 @@
 import uvicorn
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from api.routes import contracts, users, audit
+from api.core.clock import RequestClockMiddleware
 from api.core.config import settings
+from api.core.cors_asgi import FastCORS
+from api.core.health import HealthCheckMiddleware
+from api.core.responses import ORJSONResponse
+from api.routes import contracts, users, audit
+from api.services.ai_service import AIService
+from api.services.blockchain import BlockchainService
+from api.services.openai_aiohttp import close_session
+from api.services.visualisation import VisualizationService
 
 app = FastAPI(
     title="Smart Contract Intelligence Platform",
     description="AI-powered platform for creating, visualizing, and auditing smart contracts",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+    openapi_url=None if settings.DISABLE_OPENAPI else "/openapi.json",
 )
 
+# Capture one timestamp per request for model default_factory fields
+app.add_middleware(RequestClockMiddleware)
+
 # Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+app.add_middleware(FastCORS, origins=settings.CORS_ORIGINS)
+
+# Health probes are answered before any other middleware (added last = outermost)
+app.add_middleware(HealthCheckMiddleware)
 
 # Include routers
 app.include_router(contracts.router, prefix="/api/contracts", tags=["contracts"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(audit.router, prefix="/api/audit", tags=["audit"])
 
-@app.get("/", tags=["health"])
-async def health_check():
-    return {"status": "healthy", "service": "smart-contract-intelligence-api"}
+@app.on_event("startup")
+async def create_services():
+    # One shared instance per service instead of one per request
+    app.state.ai_service = AIService()
+    app.state.blockchain_service = BlockchainService()
+    app.state.visualization_service = VisualizationService()
+
+@app.on_event("shutdown")
+async def close_services():
+    await app.state.blockchain_service.close()
+    await app.state.ai_service.close()
+    await close_session()
 
 if __name__ == "__main__":
-    uvicorn.run("api.main:app", host="0.0.0.0", port=settings.PORT, reload=settings.DEBUG)
\ No newline at end of file
+    uvicorn.run(
+        "api.main:app",
+        host="0.0.0.0",
+        port=settings.PORT,
+        reload=settings.DEBUG,
+        # Reload runs a single process, so workers only apply outside debug.
+        # loop/http stay on "auto", which picks uvloop and httptools (see
+        # requirements.txt) and falls back where they are unavailable.
+        workers=None if settings.DEBUG else settings.WORKERS,
+    )
\ No newline at end of file
@@ -2,6 +2,8 @@ from datetime import datetime
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field, EmailStr
 from bson import ObjectId
+from bson.errors import InvalidId
+from api.core.clock import utcnow
 
 
 # Custom ObjectId field for MongoDB compatibility
@@ -12,9 +14,15 @@ class PyObjectId(ObjectId):
 
     @classmethod
     def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return ObjectId(v)
+        if isinstance(v, ObjectId):
+            return v
+        # The ObjectId constructor already validates, so don't run is_valid() first
+        if isinstance(v, (str, bytes)):
+            try:
+                return ObjectId(v)
+            except InvalidId:
+                pass
+        raise ValueError("Invalid ObjectId")
 
     @classmethod
     def __modify_schema__(cls, field_schema):
@@ -48,8 +56,8 @@ class UserDB(MongoBaseModel, UserBase):
     hashed_password: str
     is_active: bool = True
     is_verified: bool = False
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utcnow)
+    updated_at: datetime = Field(default_factory=utcnow)
     wallet_address: Optional[str] = None
 
 
@@ -78,8 +86,8 @@ class ContractDB(MongoBaseModel, ContractBase):
     owner_id: str
     contract_code: str
     parameters: Dict[str, Any] = {}
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utcnow)
+    updated_at: datetime = Field(default_factory=utcnow)
     deployed_address: Optional[str] = None
     deployment_info: Optional[Dict[str, Any]] = None
     version: int = 1
@@ -121,8 +129,8 @@ class TemplateDB(MongoBaseModel, TemplateBase):
     contract_code: str
     default_parameters: Dict[str, Any] = {}
     author_id: str
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utcnow)
+    updated_at: datetime = Field(default_factory=utcnow)
     usage_count: int = 0
     rating: float = 0.0
     ratings_count: int = 0
@@ -153,7 +161,7 @@ class AuditDB(MongoBaseModel):
     audit_type: str
     status: str = "pending" # pending, completed, failed
     results: Optional[Dict[str, Any]] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utcnow)
     completed_at: Optional[datetime] = None
     vulnerabilities: List[Dict[str, Any]] = []
     suggestions: List[str] = []
@@ -189,7 +197,7 @@ class DeploymentDB(MongoBaseModel):
     status: str = "pending"  # pending, completed, failed
     tx_hash: Optional[str] = None
     contract_address: Optional[str] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utcnow)
     completed_at: Optional[datetime] = None
     gas_used: Optional[int] = None
     gas_price: Optional[str] = None
@@ -1,19 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import Optional
+import msgspec
 from api.services.ai_service import AIService
 from api.services.blockchain import BlockchainService
+from api.core.deps import get_ai_service, get_blockchain_service
+from api.core.msgspec_io import MsgspecResponse, msgspec_body, msgspec_request_body, msgspec_responses
 from api.core.security import get_current_user
 from api.schemas.user import User
-from pydantic import BaseModel
 
 router = APIRouter()
 
-class AuditRequest(BaseModel):
+class AuditRequest(msgspec.Struct):
     contract_id: str
     contract_code: Optional[str] = None
     audit_type: str = "security"  # security, gas, best_practices
 
-class AuditResponse(BaseModel):
+class AuditResponse(msgspec.Struct):
     id: str
     status: str
     contract_id: str
@@ -22,12 +24,16 @@ class AuditResponse(BaseModel):
     vulnerabilities: list = []
     suggestions: list = []
 
-@router.post("/contract", response_model=AuditResponse)
+@router.post(
+    "/contract",
+    openapi_extra=msgspec_request_body(AuditRequest),
+    responses=msgspec_responses(AuditResponse)
+)
 async def audit_contract(
-    audit_request: AuditRequest,
+    audit_request: AuditRequest = Depends(msgspec_body(AuditRequest)),
     current_user: User = Depends(get_current_user),
-    ai_service: AIService = Depends(),
-    blockchain_service: BlockchainService = Depends()
+    ai_service: AIService = Depends(get_ai_service),
+    blockchain_service: BlockchainService = Depends(get_blockchain_service)
 ):
     """
     Audit a smart contract for security vulnerabilities
@@ -53,7 +59,7 @@ async def audit_contract(
             contract_code = contract.contract_code
         
         # Validate contract code
-        validation_result = ai_service.validate_contract(contract_code)
+        validation_result = await ai_service.validate_contract(contract_code)
         
         # Create a new audit record
         audit_id = f"audit-{audit_request.contract_id}-{audit_request.audit_type}"
@@ -61,24 +67,16 @@ async def audit_contract(
         # In a real implementation, this would store the audit in the database
         # and possibly trigger an asynchronous process for deeper analysis
         
-        return {
-            "id": audit_id,
-            "status": "completed",
-            "contract_id": audit_request.contract_id,
-            "audit_type": audit_request.audit_type,
-            "security_score": 85 if validation_result.is_valid else 60,
-            "vulnerabilities": [
-                {
-                    "type": issue.get("type", "unknown"),
-                    "severity": issue.get("severity", "low"),
-                    "location": issue.get("location", ""),
-                    "description": issue.get("description", ""),
-                    "suggestion": issue.get("suggestion", "")
-                }
-                for issue in validation_result.issues
-            ],
-            "suggestions": validation_result.suggestions
-        }
+        return MsgspecResponse(AuditResponse(
+            id=audit_id,
+            status="completed",
+            contract_id=audit_request.contract_id,
+            audit_type=audit_request.audit_type,
+            security_score=85 if validation_result.is_valid else 60,
+            # AIService.validate_contract already returns issues in this shape
+            vulnerabilities=validation_result.issues,
+            suggestions=validation_result.suggestions
+        ))
     
     except Exception as e:
         raise HTTPException(
@@ -86,11 +84,11 @@ async def audit_contract(
             detail=f"Failed to audit contract: {str(e)}"
         )
 
-@router.get("/{audit_id}", response_model=AuditResponse)
+@router.get("/{audit_id}", responses=msgspec_responses(AuditResponse))
 async def get_audit_result(
     audit_id: str,
     current_user: User = Depends(get_current_user),
-    blockchain_service: BlockchainService = Depends()
+    blockchain_service: BlockchainService = Depends(get_blockchain_service)
 ):
     """
     Get the result of a previous audit
@@ -100,15 +98,17 @@ async def get_audit_result(
         # For demo purposes, we'll return a sample audit result
         
         # Extract contract_id from audit_id
-        parts = audit_id.split("-")
-        if len(parts) < 3 or parts[0] != "audit":
+        # Format is audit-{contract_id}-{audit_type}
+        if not audit_id.startswith("audit-"):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid audit ID format"
             )
         
-        contract_id = parts[1]
-        audit_type = parts[2] if len(parts) > 2 else "security"
+        rest = audit_id[6:]
+        contract_id, sep, audit_type = rest.rpartition("-")
+        if not sep:
+            contract_id, audit_type = rest, "security"
         
         # Check if contract exists and user has access
         contract = await blockchain_service.get_contract(contract_id)
@@ -124,13 +124,13 @@ async def get_audit_result(
                 detail="You don't have permission to access this audit"
             )
         
-        return {
-            "id": audit_id,
-            "status": "completed",
-            "contract_id": contract_id,
-            "audit_type": audit_type,
-            "security_score": 85,
-            "vulnerabilities": [
+        return MsgspecResponse(AuditResponse(
+            id=audit_id,
+            status="completed",
+            contract_id=contract_id,
+            audit_type=audit_type,
+            security_score=85,
+            vulnerabilities=[
                 {
                     "type": "security",
                     "severity": "medium",
@@ -139,11 +139,11 @@ async def get_audit_result(
                     "suggestion": "Use SafeMath library or Solidity 0.8+ for automatic overflow checking"
                 }
             ],
-            "suggestions": [
+            suggestions=[
                 "Add more comprehensive event logging",
                 "Consider adding a pause mechanism for emergency situations"
             ]
-        }
+        ))
     
     except Exception as e:
         raise HTTPException(
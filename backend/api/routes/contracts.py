@@ -1,40 +1,51 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, List, Optional
+import orjson
 from api.schemas.contract import (
     ContractCreate,
     ContractResponse,
     ContractList,
+    ContractAnalyzeRequest,
+    ContractAnalysisResponse,
     ContractVisualizeRequest,
     VisualizationResponse
 )
 from api.services.ai_service import AIService
 from api.services.blockchain import BlockchainService
-from api.services.visualization import VisualizationService
+from api.services.visualisation import VisualizationService
+from api.core.deps import get_ai_service, get_blockchain_service, get_visualization_service
+from api.core.msgspec_io import MsgspecResponse, msgspec_responses
 from api.core.security import get_current_user
 from api.schemas.user import User
 
 router = APIRouter()
 
+async def _sse_events(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Encode {"event", "data"} dicts as server-sent events"""
+    async for event in events:
+        yield b"event: " + event["event"].encode() + b"\ndata: " + orjson.dumps(event["data"]) + b"\n\n"
+
 @router.post("/create", response_model=ContractResponse, status_code=status.HTTP_201_CREATED)
 async def create_contract(
         contract_request: ContractCreate,
         current_user: User = Depends(get_current_user),
-        ai_service: AIService = Depends(),
-        blockchain_service: BlockchainService = Depends()
+        ai_service: AIService = Depends(get_ai_service),
+        blockchain_service: BlockchainService = Depends(get_blockchain_service)
 ):
     """
     Create a new smart contract from natural language description
     """
     try:
         # Generate smart contract code using AI
-        contract_code = ai_service.generate_contract_code(
+        contract_code = await ai_service.generate_contract_code(
             description=contract_request.description,
             contract_type=contract_request.contract_type,
             params=contract_request.parameters
         )
 
         # Validate the generated contract
-        validation_result = ai_service.validate_contract(contract_code)
+        validation_result = await ai_service.validate_contract(contract_code)
         if not validation_result.is_valid:
             return {
                 "status": "error",
@@ -67,10 +78,10 @@ async def create_contract(
             detail=f"Failed to create contract: {str(e)}"
         )
 
-@router.get("/list", response_model=ContractList)
+@router.get("/list", responses=msgspec_responses(ContractList))
 async def list_contracts(
         current_user: User = Depends(get_current_user),
-        blockchain_service: BlockchainService = Depends(),
+        blockchain_service: BlockchainService = Depends(get_blockchain_service),
         skip: int = 0,
         limit: int = 100
 ):
@@ -82,13 +93,16 @@ async def list_contracts(
         skip=skip,
         limit=limit
     )
-    return {"contracts": contracts, "total": len(contracts)}
+    return MsgspecResponse(ContractList(
+        contracts=[contract.dict() for contract in contracts],
+        total=len(contracts)
+    ))
 
 @router.get("/{contract_id}", response_model=ContractResponse)
 async def get_contract(
         contract_id: str,
         current_user: User = Depends(get_current_user),
-        blockchain_service: BlockchainService = Depends()
+        blockchain_service: BlockchainService = Depends(get_blockchain_service)
 ):
     """
     Get a specific contract by ID
@@ -109,37 +123,70 @@ async def get_contract(
 
     return contract
 
-@router.post("/visualize", response_model=VisualizationResponse)
+@router.post("/visualize", responses=msgspec_responses(VisualizationResponse))
 async def visualize_contract(
         visualization_request: ContractVisualizeRequest,
-        visualization_service: VisualizationService = Depends(),
-        ai_service: AIService = Depends()
+        visualization_service: VisualizationService = Depends(get_visualization_service),
+        ai_service: AIService = Depends(get_ai_service)
 ):
     """
     Generate a visual representation of a smart contract
     """
     # Parse the contract to understand its structure
-    contract_structure = ai_service.analyze_contract_structure(
+    contract_structure = await ai_service.analyze_contract_structure(
         visualization_request.contract_code
     )
 
     # Generate visualization
-    visualization = visualization_service.generate_visualization(
+    visualization = await visualization_service.generate_visualization(
         contract_structure=contract_structure,
-        visualization_type=visualization_request.visualization_type
+        visualization_type=visualization_request.visualization_type,
+        include_mermaid=visualization_request.include_mermaid
     )
 
-    return {
-        "status": "success",
-        "visualization_data": visualization,
-        "contract_analysis": contract_structure.summary
-    }
+    return MsgspecResponse(VisualizationResponse(
+        status="success",
+        visualization_data=visualization,
+        contract_analysis=contract_structure.summary
+    ))
+
+@router.post("/analyze", responses=msgspec_responses(ContractAnalysisResponse))
+async def analyze_contract(
+        analyze_request: ContractAnalyzeRequest,
+        current_user: User = Depends(get_current_user),
+        ai_service: AIService = Depends(get_ai_service)
+):
+    """
+    Validate a smart contract and analyze its structure in a single AI call
+    """
+    validation, structure = await ai_service.validate_and_analyze(analyze_request.contract_code)
+
+    return MsgspecResponse(ContractAnalysisResponse(
+        status="success",
+        validation=validation.dict(),
+        structure=structure.dict()
+    ))
+
+@router.post("/analyze/stream")
+async def stream_contract_analysis(
+        analyze_request: ContractAnalyzeRequest,
+        current_user: User = Depends(get_current_user),
+        ai_service: AIService = Depends(get_ai_service)
+):
+    """
+    Stream a contract's structure analysis as server-sent events: one
+    "function" event per function as it is parsed, then a "structure" event
+    """
+    return StreamingResponse(
+        _sse_events(ai_service.analyze_contract_structure_stream(analyze_request.contract_code)),
+        media_type="text/event-stream"
+    )
 
 @router.post("/deploy/{contract_id}")
 async def deploy_contract(
         contract_id: str,
         current_user: User = Depends(get_current_user),
-        blockchain_service: BlockchainService = Depends()
+        blockchain_service: BlockchainService = Depends(get_blockchain_service)
 ):
     """
     Deploy a contract to the blockchain
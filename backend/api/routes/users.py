@@ -1,7 +1,7 @@
+import itertools
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import Optional
-from datetime import timedelta
 from api.schemas.user import UserCreate, User, Token, UserLogin
 from api.core.security import get_password_hash, verify_password, create_access_token, get_current_user
 from api.core.config import settings
@@ -13,6 +13,11 @@ router = APIRouter()
 # In a real implementation, this would use a proper database
 USERS_DB = {}
 
+# Lookup index into USERS_DB (email -> user_id) and the set of taken usernames
+_EMAIL_INDEX = {}
+_USERNAMES = set()
+_USER_IDS = itertools.count(1)
+
 class UserDB(BaseModel):
     id: str
     email: str
@@ -28,27 +33,38 @@ async def register_user(user_data: UserCreate):
     Register a new user
     """
     # Check if email is already registered
-    if any(u.email == user_data.email for u in USERS_DB.values()):
+    if user_data.email in _EMAIL_INDEX:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
     # Check if username is already taken
-    if any(u.username == user_data.username for u in USERS_DB.values()):
+    if user_data.username in _USERNAMES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
         )
     
     # Create user ID
-    user_id = f"user_{len(USERS_DB) + 1}"
+    user_id = f"user_{next(_USER_IDS)}"
+    
+    # Claim the email and username before hashing. The hash runs in a worker
+    # thread, so a concurrent duplicate registration would otherwise pass the
+    # checks above and burn a bcrypt hash of its own.
+    _EMAIL_INDEX[user_data.email] = user_id
+    _USERNAMES.add(user_data.username)
     
-    # Hash the password
-    hashed_password = get_password_hash(user_data.password)
+    # Hash the password (only ever reached for a new email and username)
+    try:
+        hashed_password = await get_password_hash(user_data.password)
+    except Exception:
+        del _EMAIL_INDEX[user_data.email]
+        _USERNAMES.discard(user_data.username)
+        raise
     
-    # Create user in database
-    user = UserDB(
+    # Create user in database (fields come from the already validated request body)
+    user = UserDB.construct(
         id=user_id,
         email=user_data.email,
         username=user_data.username,
@@ -73,15 +89,11 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = None
-    
     # Find user by email (in a real app, this would be a database query)
-    for u in USERS_DB.values():
-        if u.email == form_data.username:
-            user = u
-            break
+    user_id = _EMAIL_INDEX.get(form_data.username)
+    user = USERS_DB.get(user_id) if user_id else None
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -89,9 +101,8 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         )
     
     # Create access token
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.id}, expires_delta=access_token_expires
+        data={"sub": user.id}, expires_delta=settings.access_token_expire_delta
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
@@ -101,24 +112,19 @@ async def login(login_data: UserLogin):
     """
     Login endpoint for email/password authentication
     """
-    user = None
-    
     # Find user by email
-    for u in USERS_DB.values():
-        if u.email == login_data.email:
-            user = u
-            break
+    user_id = _EMAIL_INDEX.get(login_data.email)
+    user = USERS_DB.get(user_id) if user_id else None
     
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    if not user or not await verify_password(login_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
     # Create access token
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.id}, expires_delta=access_token_expires
+        data={"sub": user.id}, expires_delta=settings.access_token_expire_delta
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
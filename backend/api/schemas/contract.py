@@ -1,4 +1,5 @@
 from typing import Dict, List, Optional, Any
+import msgspec
 from pydantic import BaseModel
 
 class ContractCreate(BaseModel):
@@ -15,15 +16,26 @@ class ContractResponse(BaseModel):
     message: Optional[str] = None
     draft_code: Optional[str] = None
 
-class ContractList(BaseModel):
+# Response-only DTOs with no custom validation are msgspec Structs and are
+# returned through api.core.msgspec_io.MsgspecResponse
+class ContractList(msgspec.Struct):
     contracts: List[Dict[str, Any]]
     total: int
 
+class ContractAnalyzeRequest(BaseModel):
+    contract_code: str
+
 class ContractVisualizeRequest(BaseModel):
     contract_code: str
     visualization_type: str = "flowchart"  # flowchart, sequence, interaction
+    include_mermaid: bool = False  # Also return Mermaid source (flowchart/sequence only)
+
+class ContractAnalysisResponse(msgspec.Struct):
+    status: str
+    validation: Dict[str, Any]
+    structure: Dict[str, Any]
 
-class VisualizationResponse(BaseModel):
+class VisualizationResponse(msgspec.Struct):
     status: str
     visualization_data: Dict[str, Any]
     contract_analysis: Dict[str, Any]
\ No newline at end of file
@@ -0,0 +1,45 @@
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict
+import orjson
+from api.core.ttl_cache import TTLCache
+
+# Completed AI results keyed by a digest of (operation, input) -> orjson-encoded
+# result. Results are stored encoded so every hit hands back
+# a fresh copy that callers can mutate freely.
+_AI_CACHE_MAX_SIZE = 2048
+_AI_CACHE_TTL = 86400  # seconds
+_ai_cache: "TTLCache[bytes, bytes]" = TTLCache(_AI_CACHE_MAX_SIZE, _AI_CACHE_TTL)
+
+# Computations currently running, so concurrent misses on the same key share one call
+_in_flight: Dict[bytes, "asyncio.Task[bytes]"] = {}
+
+def cache_key(operation: str, text: str) -> bytes:
+    """Exact-match key for an AI operation over some input text"""
+    return hashlib.sha256(operation.encode() + b"\0" + text.encode()).digest()
+
+async def _compute_encoded(key: bytes, compute: Callable[[], Awaitable[Any]]) -> bytes:
+    try:
+        encoded = orjson.dumps(await compute())
+    finally:
+        del _in_flight[key]
+
+    _ai_cache.set(key, encoded)
+    return encoded
+
+async def get_or_compute(key: bytes, compute: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Return the cached result for `key`, or await `compute()` and cache it.
+    Results must be JSON-serializable and come back as plain JSON data.
+    Exceptions from `compute` propagate to every waiter and are not cached.
+    """
+    encoded = _ai_cache.get(key)
+    if encoded is not None:
+        return orjson.loads(encoded)
+
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_compute_encoded(key, compute))
+        _in_flight[key] = task
+    # Shielded so one caller disconnecting doesn't cancel the call for the others
+    return orjson.loads(await asyncio.shield(task))
\ No newline at end of file
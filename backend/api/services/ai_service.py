@@ -1,68 +1,62 @@
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Callable, Dict, List, Optional, Any, Tuple, TypeVar
+import httpx
+import ijson
 import openai
+import orjson
 from pydantic import BaseModel
 from api.core.config import settings
+from api.core.json_repair import loads_lenient
+from api.services.ai_cache import cache_key, get_or_compute
+from api.services.openai_aiohttp import chat_completion, message_content
+from api.services.openai_parallel import run_api_request_processor
 
-class ValidationResult(BaseModel):
-    is_valid: bool
-    issues: List[Dict[str, str]] = []
-    suggestions: List[str] = []
+# System messages, shared by every request of each kind
+_SYSTEM_GENERATOR = {"role": "system", "content": "You are an expert Solidity developer specializing in secure, gas-efficient smart contracts. Your task is to generate production-ready smart contract code based on user requirements."}
+_SYSTEM_VALIDATOR = {"role": "system", "content": "You are an expert smart contract security auditor. Analyze the given Solidity contract and return a JSON response with your findings."}
+_SYSTEM_ANALYZER = {"role": "system", "content": "You are an expert Solidity analyzer that extracts structured information from smart contracts."}
+_SYSTEM_AUDITOR_ANALYZER = {"role": "system", "content": "You are an expert smart contract security auditor and Solidity analyzer. Review the given Solidity contract and extract its structure, returning both as a single JSON response."}
+_SYSTEM_JSON_FIXER = {"role": "system", "content": "You repair malformed JSON. Reply with only the corrected JSON object, keeping its content unchanged."}
 
-class ContractStructure(BaseModel):
-    functions: List[Dict[str, Any]]
-    variables: List[Dict[str, Any]]
-    events: List[Dict[str, Any]]
-    modifiers: List[Dict[str, Any]]
-    inheritance: List[str]
-    summary: Dict[str, Any]
-
-class AIService:
-    def __init__(self):
-        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+# Contract type -> template description used in the generation prompt
+_CONTRACT_TEMPLATES = {
+    "token": "ERC20 token contract with customizable features",
+    "nft": "ERC721 NFT contract with minting and royalties",
+    "dao": "Decentralized Autonomous Organization with voting",
+    "marketplace": "Marketplace for buying and selling digital assets",
+    "escrow": "Escrow service for secure transactions",
+    "staking": "Staking contract with rewards distribution",
+    "multisig": "Multi-signature wallet",
+    # Add more templates as needed
+}
 
-    def generate_contract_code(
-            self,
-            description: str,
-            contract_type: str,
-            params: Dict[str, Any]
-    ) -> str:
-        """
-        Generate Solidity smart contract code from natural language description
-        using GPT-4 or equivalent LLM.
+# Prompt templates, filled in with str.format. Each starts with its static
+# instructions and ends with the per-request values, so the system message plus
+# that prefix are byte-identical across calls and eligible for prompt caching.
+_GENERATION_PROMPT_TEMPLATE = """
+        Generate a secure, gas-efficient, and well-documented Solidity smart contract based on the requirements below.
+        
+        Requirements:
+        1. Use the latest stable Solidity version
+        2. Follow best security practices and include protection against common vulnerabilities
+        3. Optimize for gas efficiency
+        4. Include comprehensive NatSpec documentation
+        5. Implement appropriate access control mechanisms
+        6. Add thorough error handling with custom error messages
+        7. Include events for all significant state changes
+        
+        Return only the Solidity code without any additional explanation.
+        
+        CONTRACT TYPE: {contract_type}
+        TEMPLATE: {template_desc}
+        
+        DESCRIPTION:
+        {description}
+        
+        PARAMETERS:
+        {params_str}
         """
-        prompt = self._build_contract_generation_prompt(
-            description=description,
-            contract_type=contract_type,
-            params=params
-        )
 
-        response = self.client.chat.completions.create(
-            model="gpt-4-turbo",  # Or the latest appropriate model
-            messages=[
-                {"role": "system", "content": "You are an expert Solidity developer specializing in secure, gas-efficient smart contracts. Your task is to generate production-ready smart contract code based on user requirements."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2,  # Low temperature for more deterministic output
-            max_tokens=3000
-        )
-
-        # Extract the Solidity code from the response
-        contract_code = response.choices[0].message.content.strip()
-
-        # Clean up the response to extract just the code (remove markdown formatting if present)
-        if "```solidity" in contract_code:
-            contract_code = contract_code.split("```solidity")[1].split("```")[0].strip()
-        elif "```" in contract_code:
-            contract_code = contract_code.split("```")[1].split("```")[0].strip()
-
-        return contract_code
-
-    def validate_contract(self, contract_code: str) -> ValidationResult:
-        """
-        Validate the generated smart contract for common security issues,
-        best practices, and gas efficiency.
-        """
-        prompt = f"""
+_VALIDATION_PROMPT_TEMPLATE = """
         Please analyze the following Solidity smart contract for:
         1. Security vulnerabilities (reentrancy, overflow/underflow, etc.)
         2. Gas optimization issues
@@ -74,11 +68,6 @@ class AIService:
         - A description of the problem
         - A suggested fix
         
-        Contract code:
-        ```solidity
-        {contract_code}
-        ```
-        
         Format your response as JSON with the following structure:
         {{
             "is_valid": true/false,
@@ -96,37 +85,14 @@ class AIService:
                 "General improvement suggestion 2"
             ]
         }}
+        
+        Contract code:
+        ```solidity
+        {contract_code}
+        ```
         """
 
-        response = self.client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert smart contract security auditor. Analyze the given Solidity contract and return a JSON response with your findings."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.1
-        )
-
-        try:
-            import json
-            result = json.loads(response.choices[0].message.content)
-            return ValidationResult(**result)
-        except Exception as e:
-            # Fallback in case of parsing errors
-            return ValidationResult(
-                is_valid=False,
-                issues=[{"type": "system", "severity": "high", "location": "validation",
-                         "description": f"Failed to validate contract: {str(e)}",
-                         "suggestion": "Please try again or contact support."}]
-            )
-
-    def analyze_contract_structure(self, contract_code: str) -> ContractStructure:
-        """
-        Analyze the structure of a smart contract to extract its components
-        for visualization purposes.
-        """
-        prompt = f"""
+_STRUCTURE_PROMPT_TEMPLATE = """
         Please analyze the following Solidity smart contract and extract its structural components.
         Return the analysis as a JSON object with the following structure:
         
@@ -187,36 +153,513 @@ class AIService:
         ```
         """
 
-        response = self.client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert Solidity analyzer that extracts structured information from smart contracts."},
-                {"role": "user", "content": prompt}
-            ],
+_VALIDATE_AND_ANALYZE_PROMPT_TEMPLATE = """
+        Please review the following Solidity smart contract and do two things.
+
+        1. Validate it for:
+           - Security vulnerabilities (reentrancy, overflow/underflow, etc.)
+           - Gas optimization issues
+           - Best practice violations
+           - Logical errors or edge cases
+           For each issue found, give the specific line or function, a description of the problem and a suggested fix.
+
+        2. Extract its structural components: functions, state variables, events, modifiers, inherited contracts and a summary.
+
+        Format your response as a single JSON object with the following structure:
+        {{
+            "validation": {{
+                "is_valid": true/false,
+                "issues": [
+                    {{
+                        "type": "security|gas|best_practice|logical",
+                        "severity": "high|medium|low",
+                        "location": "function name or line number",
+                        "description": "Description of the issue",
+                        "suggestion": "Suggested fix"
+                    }}
+                ],
+                "suggestions": ["General improvement suggestion 1"]
+            }},
+            "structure": {{
+                "functions": [
+                    {{
+                        "name": "functionName",
+                        "visibility": "public|private|internal|external",
+                        "modifiers": ["modifier1"],
+                        "parameters": [{{"name": "param1", "type": "uint256"}}],
+                        "returns": [{{"type": "bool"}}],
+                        "description": "Brief description of what this function does"
+                    }}
+                ],
+                "variables": [
+                    {{"name": "variableName", "type": "address", "visibility": "public|private|internal", "constant": true/false}}
+                ],
+                "events": [
+                    {{"name": "EventName", "parameters": [{{"name": "param1", "type": "address", "indexed": true}}]}}
+                ],
+                "modifiers": [
+                    {{"name": "modifierName", "parameters": [{{"name": "param1", "type": "uint256"}}]}}
+                ],
+                "inheritance": ["BaseContract1"],
+                "summary": {{
+                    "contractName": "MyContract",
+                    "description": "A high-level description of what this contract does",
+                    "main_functionality": "The primary purpose of this contract",
+                    "security_features": ["Feature1"],
+                    "data_flow": ["Step 1: User calls function X", "Step 2: Function X updates state Y"]
+                }}
+            }}
+        }}
+
+        Contract code:
+        ```solidity
+        {contract_code}
+        ```
+        """
+
+T = TypeVar("T")
+
+# Batch jobs that ended without producing output
+_BATCH_FAILED_STATUSES = {"failed", "expired", "cancelled"}
+
+def _chat_body(system: Dict[str, str], user: str, **overrides: Any) -> Dict[str, Any]:
+    """Chat completion request body with the configured model and one user turn"""
+    return {
+        "model": settings.OPENAI_MODEL,
+        "messages": [system, {"role": "user", "content": user}],
+        **overrides
+    }
+
+async def _chat(system: Dict[str, str], user: str, **overrides: Any) -> Dict[str, Any]:
+    return await chat_completion(**_chat_body(system, user, **overrides))
+
+class ValidationResult(BaseModel):
+    is_valid: bool
+    issues: List[Dict[str, str]] = []
+    suggestions: List[str] = []
+
+class ContractStructure(BaseModel):
+    functions: List[Dict[str, Any]]
+    variables: List[Dict[str, Any]]
+    events: List[Dict[str, Any]]
+    modifiers: List[Dict[str, Any]]
+    inheritance: List[str]
+    summary: Dict[str, Any]
+
+# JSON schema the self-hosted model is constrained to when extracting structure
+_CONTRACT_STRUCTURE_SCHEMA = ContractStructure.schema()
+
+# Fields (and defaults) every validation issue is returned with
+_ISSUE_DEFAULTS = {
+    "type": "unknown",
+    "severity": "low",
+    "location": "",
+    "description": "",
+    "suggestion": ""
+}
+
+def _shape_issue(issue: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize an issue from the model to exactly the fields in _ISSUE_DEFAULTS"""
+    get = issue.get
+    return {key: get(key, default) for key, default in _ISSUE_DEFAULTS.items()}
+
+class _MalformedCompletion(Exception):
+    """The model's reply could not be parsed; the original error is the __cause__"""
+
+def _validation_failure(error: Exception) -> ValidationResult:
+    """Fallback result when a validation request or its parsing fails"""
+    return ValidationResult(
+        is_valid=False,
+        issues=[{"type": "system", "severity": "high", "location": "validation",
+                 "description": f"Failed to validate contract: {str(error)}",
+                 "suggestion": "Please try again or contact support."}]
+    )
+
+def _structure_failure(error: Exception) -> ContractStructure:
+    """Fallback with minimal structure when an analysis request or its parsing fails"""
+    return ContractStructure(
+        functions=[],
+        variables=[],
+        events=[],
+        modifiers=[],
+        inheritance=[],
+        summary={
+            "contractName": "Unknown",
+            "description": f"Error analyzing contract: {str(error)}",
+            "main_functionality": "Unknown",
+            "security_features": [],
+            "data_flow": []
+        }
+    )
+
+class AIService:
+    def __init__(self):
+        # Completions go through the aiohttp backend (api.services.openai_aiohttp);
+        # the SDK client is kept for endpoints beyond chat completions
+        self._client: Optional[openai.AsyncOpenAI] = None
+
+    @property
+    def client(self) -> openai.AsyncOpenAI:
+        """
+        The OpenAI SDK client, created on first use. The SDK refuses to build a
+        client without an API key, so creating it at startup would keep the
+        whole app (health probes, auth, blockchain routes) from starting.
+        """
+        if self._client is None:
+            self._client = openai.AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+                )
+            )
+        return self._client
+
+    async def close(self):
+        """Close the OpenAI client and its connection pool, if it was created"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def generate_contract_code(
+            self,
+            description: str,
+            contract_type: str,
+            params: Dict[str, Any]
+    ) -> str:
+        """
+        Generate Solidity smart contract code from natural language description
+        using GPT-4 or equivalent LLM.
+        """
+        prompt = self._build_contract_generation_prompt(
+            description=description,
+            contract_type=contract_type,
+            params=params
+        )
+
+        response = await _chat(
+            _SYSTEM_GENERATOR,
+            prompt,
+            temperature=0.2,  # Low temperature for more deterministic output
+            max_tokens=3000
+        )
+
+        # Extract the Solidity code from the response
+        contract_code = message_content(response).strip()
+
+        # Clean up the response to extract just the code (remove markdown formatting if present)
+        if "```solidity" in contract_code:
+            contract_code = contract_code.split("```solidity")[1].split("```")[0].strip()
+        elif "```" in contract_code:
+            contract_code = contract_code.split("```")[1].split("```")[0].strip()
+
+        return contract_code
+
+    async def validate_contract(self, contract_code: str) -> ValidationResult:
+        """
+        Validate the generated smart contract for common security issues,
+        best practices, and gas efficiency. Results are cached per exact source.
+        """
+        async def compute() -> Dict[str, Any]:
+            response = await chat_completion(**self._validation_request(contract_code))
+            return (await self._load_or_repair(message_content(response), self._load_validation)).dict()
+
+        try:
+            result = await get_or_compute(cache_key("validate_contract", contract_code), compute)
+        except _MalformedCompletion as e:
+            return _validation_failure(e.__cause__)
+        return ValidationResult.construct(**result)
+
+    async def validate_many(self, contract_codes: List[str]) -> List[ValidationResult]:
+        """
+        Validate many contracts concurrently, throttled to the configured
+        OpenAI rate limits. Results are returned in input order.
+        """
+        results = await self._dispatch_many([self._validation_request(code) for code in contract_codes])
+        return [
+            _validation_failure(result) if isinstance(result, Exception)
+            else self._parse_validation(message_content(result))
+            for result in results
+        ]
+
+    async def analyze_contract_structure(self, contract_code: str) -> ContractStructure:
+        """
+        Analyze the structure of a smart contract to extract its components
+        for visualization purposes. Results are cached per exact source.
+        """
+        async def compute() -> Dict[str, Any]:
+            response = await chat_completion(**self._structure_request(contract_code))
+            return (await self._load_or_repair(message_content(response), self._load_structure)).dict()
+
+        try:
+            result = await get_or_compute(cache_key("analyze_contract_structure", contract_code), compute)
+        except _MalformedCompletion as e:
+            return _structure_failure(e.__cause__)
+        return ContractStructure.construct(**result)
+
+    async def validate_and_analyze(self, contract_code: str) -> Tuple[ValidationResult, ContractStructure]:
+        """
+        Validate a contract and analyze its structure with one completion, so
+        the contract is sent (and billed) once instead of twice. Results are
+        cached per exact source.
+        """
+        async def compute() -> Dict[str, Any]:
+            response = await _chat(
+                _SYSTEM_AUDITOR_ANALYZER,
+                _VALIDATE_AND_ANALYZE_PROMPT_TEMPLATE.format(contract_code=contract_code),
+                response_format={"type": "json_object"},
+                temperature=0.1,
+                max_tokens=settings.OPENAI_MAX_COMPLETION_TOKENS
+            )
+            validation, structure = await self._load_or_repair(message_content(response), self._load_combined)
+            return {"validation": validation.dict(), "structure": structure.dict()}
+
+        try:
+            result = await get_or_compute(cache_key("validate_and_analyze", contract_code), compute)
+        except _MalformedCompletion as e:
+            return _validation_failure(e.__cause__), _structure_failure(e.__cause__)
+        return ValidationResult.construct(**result["validation"]), ContractStructure.construct(**result["structure"])
+
+    async def analyze_contract_structure_local(self, contract_code: str) -> ContractStructure:
+        """
+        Analyze contract structure on the self-hosted SGLang server. Its
+        json_schema response format constrains decoding to ContractStructure,
+        so the reply always has the expected shape.
+        """
+        body = self._structure_request(contract_code)
+        body["model"] = settings.SGLANG_MODEL
+        body["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {"name": "contract_structure", "schema": _CONTRACT_STRUCTURE_SCHEMA}
+        }
+        response = await chat_completion(
+            **body,
+            base_url=f"{settings.SGLANG_URL}/v1/chat/completions",
+            api_key=settings.SGLANG_API_KEY
+        )
+        # Decoding can still stop early (e.g. at the token limit), so keep the fallback
+        return self._parse_structure(message_content(response))
+
+    async def analyze_contract_structure_stream(self, contract_code: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the structure analysis. Yields {"event": "function", "data": ...}
+        for each function as soon as it is complete in the model's output,
+        then a final {"event": "structure", "data": ...} with the full result.
+        """
+        functions = ijson.sendable_list()
+        parser = ijson.items_coro(functions, "functions.item", use_float=True)
+        chunks: List[str] = []
+
+        stream = await self.client.chat.completions.create(
+            **self._structure_request(contract_code),
+            stream=True
+        )
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            chunks.append(delta)
+
+            if parser is None:
+                continue
+            try:
+                parser.send(delta.encode())
+            except ijson.JSONError:
+                # Stop emitting partial results; the full reply is still parsed below
+                parser = None
+                continue
+            for function in functions:
+                yield {"event": "function", "data": function}
+            del functions[:]
+
+        yield {"event": "structure", "data": self._parse_structure("".join(chunks)).dict()}
+
+    async def analyze_many(self, contract_codes: List[str]) -> List[ContractStructure]:
+        """
+        Analyze the structure of many contracts concurrently, throttled to the
+        configured OpenAI rate limits. Results are returned in input order.
+        """
+        results = await self._dispatch_many([self._structure_request(code) for code in contract_codes])
+        return [
+            _structure_failure(result) if isinstance(result, Exception)
+            else self._parse_structure(message_content(result))
+            for result in results
+        ]
+
+    async def submit_validation_batch(self, contract_codes: List[str]) -> str:
+        """
+        Queue validation of many contracts on the OpenAI Batch API (half the
+        cost, results within 24h). Returns the batch id for
+        validation_batch_results.
+        """
+        return await self.submit_batch([self._validation_request(code) for code in contract_codes])
+
+    async def validation_batch_results(self, batch_id: str) -> Optional[List[ValidationResult]]:
+        """Validation results in submission order, or None while the batch is still running"""
+        results = await self.poll_batch(batch_id)
+        if results is None:
+            return None
+        return [
+            _validation_failure(result) if isinstance(result, Exception)
+            else self._parse_validation(message_content(result))
+            for result in results
+        ]
+
+    async def submit_structure_batch(self, contract_codes: List[str]) -> str:
+        """
+        Queue structure analysis of many contracts on the OpenAI Batch API.
+        Returns the batch id for structure_batch_results.
+        """
+        return await self.submit_batch([self._structure_request(code) for code in contract_codes])
+
+    async def structure_batch_results(self, batch_id: str) -> Optional[List[ContractStructure]]:
+        """Structure results in submission order, or None while the batch is still running"""
+        results = await self.poll_batch(batch_id)
+        if results is None:
+            return None
+        return [
+            _structure_failure(result) if isinstance(result, Exception)
+            else self._parse_structure(message_content(result))
+            for result in results
+        ]
+
+    async def submit_batch(self, request_bodies: List[Dict[str, Any]]) -> str:
+        """Upload chat completion requests as a JSONL batch input file and start the batch"""
+        lines = b"\n".join(
+            orjson.dumps({
+                "custom_id": str(index),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": body
+            })
+            for index, body in enumerate(request_bodies)
+        )
+        input_file = await self.client.files.create(file=("batch.jsonl", lines), purpose="batch")
+        batch = await self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+            metadata={"requests": str(len(request_bodies))}
+        )
+        return batch.id
+
+    async def poll_batch(self, batch_id: str) -> Optional[List[Any]]:
+        """
+        Return None while the batch is running. Once it has completed, return
+        one entry per request in submission order: the chat completion
+        response, or an exception for requests that failed.
+        """
+        batch = await self.client.batches.retrieve(batch_id)
+        if batch.status in _BATCH_FAILED_STATUSES:
+            raise RuntimeError(f"Batch {batch_id} {batch.status}")
+        if batch.status != "completed":
+            return None
+
+        results: List[Any] = [
+            RuntimeError("No result returned for this request")
+            for _ in range(int(batch.metadata["requests"]))
+        ]
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await self.client.files.content(file_id)
+            for line in content.content.splitlines():
+                if not line:
+                    continue
+                record = orjson.loads(line)
+                response = record.get("response") or {}
+                if response.get("status_code") == 200:
+                    results[int(record["custom_id"])] = response["body"]
+                else:
+                    error = record.get("error") or response.get("body", {}).get("error")
+                    results[int(record["custom_id"])] = RuntimeError(f"Batch request failed: {error}")
+        return results
+
+    async def _dispatch_many(self, request_bodies: List[Dict[str, Any]]) -> List[Any]:
+        """Send chat completion requests in parallel, bypassing the SDK"""
+        return await run_api_request_processor(
+            request_bodies,
+            # The processor does its own rate-limit-aware retries
+            send=lambda body: chat_completion(**body, max_attempts=1),
+            max_requests_per_minute=settings.OPENAI_MAX_REQUESTS_PER_MINUTE,
+            max_tokens_per_minute=settings.OPENAI_MAX_TOKENS_PER_MINUTE
+        )
+
+    def _validation_request(self, contract_code: str) -> Dict[str, Any]:
+        """Build the chat completion request for contract validation"""
+        return _chat_body(
+            _SYSTEM_VALIDATOR,
+            _VALIDATION_PROMPT_TEMPLATE.format(contract_code=contract_code),
             response_format={"type": "json_object"},
             temperature=0.1
         )
 
+    async def _load_or_repair(self, content: str, load: Callable[[str], T]) -> T:
+        """
+        Load a reply, and if it is still malformed after local repair, ask the
+        model once to fix the JSON rather than repeating the whole analysis.
+        Raises _MalformedCompletion if the reply can't be repaired either way.
+        """
         try:
-            import json
-            result = json.loads(response.choices[0].message.content)
-            return ContractStructure(**result)
-        except Exception as e:
-            # Fallback with minimal structure in case of errors
-            return ContractStructure(
-                functions=[],
-                variables=[],
-                events=[],
-                modifiers=[],
-                inheritance=[],
-                summary={
-                    "contractName": "Unknown",
-                    "description": f"Error analyzing contract: {str(e)}",
-                    "main_functionality": "Unknown",
-                    "security_features": [],
-                    "data_flow": []
-                }
+            return load(content)
+        except _MalformedCompletion as malformed:
+            original = malformed
+        try:
+            response = await _chat(
+                _SYSTEM_JSON_FIXER,
+                content,
+                response_format={"type": "json_object"},
+                temperature=0
             )
+            repaired = message_content(response)
+        except Exception:
+            # The fix-up call itself failed (HTTP error, timeout); surface the
+            # parse error so callers still fall back to their failure results
+            raise original from original.__cause__
+        return load(repaired)
+
+    def _load_validation(self, content: str) -> ValidationResult:
+        try:
+            result = loads_lenient(content)
+            result["issues"] = [_shape_issue(issue) for issue in result.get("issues", [])]
+            return ValidationResult(**result)
+        except Exception as e:
+            raise _MalformedCompletion() from e
+
+    def _load_combined(self, content: str) -> Tuple[ValidationResult, ContractStructure]:
+        try:
+            result = loads_lenient(content)
+            validation = result["validation"]
+            validation["issues"] = [_shape_issue(issue) for issue in validation.get("issues", [])]
+            return ValidationResult(**validation), ContractStructure(**result["structure"])
+        except Exception as e:
+            raise _MalformedCompletion() from e
+
+    def _parse_validation(self, content: str) -> ValidationResult:
+        try:
+            return self._load_validation(content)
+        except _MalformedCompletion as e:
+            return _validation_failure(e.__cause__)
+
+    def _structure_request(self, contract_code: str) -> Dict[str, Any]:
+        """Build the chat completion request for contract structure analysis"""
+        return _chat_body(
+            _SYSTEM_ANALYZER,
+            _STRUCTURE_PROMPT_TEMPLATE.format(contract_code=contract_code),
+            response_format={"type": "json_object"},
+            temperature=0.1
+        )
+
+    def _load_structure(self, content: str) -> ContractStructure:
+        try:
+            return ContractStructure(**loads_lenient(content))
+        except Exception as e:
+            raise _MalformedCompletion() from e
+
+    def _parse_structure(self, content: str) -> ContractStructure:
+        try:
+            return self._load_structure(content)
+        except _MalformedCompletion as e:
+            return _structure_failure(e.__cause__)
 
     def _build_contract_generation_prompt(
             self,
@@ -228,18 +671,7 @@ class AIService:
         Build a detailed prompt for contract generation based on user input
         """
         # Template selection based on contract type
-        contract_templates = {
-            "token": "ERC20 token contract with customizable features",
-            "nft": "ERC721 NFT contract with minting and royalties",
-            "dao": "Decentralized Autonomous Organization with voting",
-            "marketplace": "Marketplace for buying and selling digital assets",
-            "escrow": "Escrow service for secure transactions",
-            "staking": "Staking contract with rewards distribution",
-            "multisig": "Multi-signature wallet",
-            # Add more templates as needed
-        }
-
-        template_desc = contract_templates.get(
+        template_desc = _CONTRACT_TEMPLATES.get(
             contract_type,
             "Custom smart contract based on description"
         )
@@ -247,28 +679,11 @@ class AIService:
         # Convert parameters to a formatted string
         params_str = "\n".join([f"- {k}: {v}" for k, v in params.items()])
 
-        prompt = f"""
-        Generate a secure, gas-efficient, and well-documented Solidity smart contract based on the following requirements:
-        
-        CONTRACT TYPE: {contract_type}
-        TEMPLATE: {template_desc}
-        
-        DESCRIPTION:
-        {description}
-        
-        PARAMETERS:
-        {params_str}
-        
-        Requirements:
-        1. Use the latest stable Solidity version
-        2. Follow best security practices and include protection against common vulnerabilities
-        3. Optimize for gas efficiency
-        4. Include comprehensive NatSpec documentation
-        5. Implement appropriate access control mechanisms
-        6. Add thorough error handling with custom error messages
-        7. Include events for all significant state changes
-        
-        Return only the Solidity code without any additional explanation.
-        """
+        prompt = _GENERATION_PROMPT_TEMPLATE.format(
+            contract_type=contract_type,
+            template_desc=template_desc,
+            description=description,
+            params_str=params_str
+        )
 
         return prompt
\ No newline at end of file
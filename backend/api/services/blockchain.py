@@ -1,23 +1,38 @@
+import asyncio
+import random
 from typing import Dict, List, Optional, Any
 import httpx
+import orjson
 from pydantic import BaseModel
 from api.core.config import settings
 
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Retries for transient failures talking to the Go service: up to
+# _MAX_ATTEMPTS tries with jittered exponential backoff between them
+_MAX_ATTEMPTS = 3
+_RETRY_INITIAL_WAIT = 0.5  # seconds
+_RETRY_MAX_WAIT = 5.0  # seconds
+_RETRYABLE_STATUS_CODES = {502, 503, 504}
+
 class DeploymentResult(BaseModel):
     tx_hash: str
     contract_address: str
     cost: float
     block_number: int
 
-class Contract(BaseModel):
+class ContractSummary(BaseModel):
+    """Contract as returned by list endpoints, without code or deployment details"""
     id: str
     owner_id: str
-    contract_code: str
     metadata: Dict[str, Any]
     created_at: str
     updated_at: str
     is_public: bool = False
     deployed_address: Optional[str] = None
+
+class Contract(ContractSummary):
+    contract_code: str
     deployment_info: Optional[Dict[str, Any]] = None
 
 class BlockchainService:
@@ -27,8 +42,13 @@ class BlockchainService:
     """
 
     def __init__(self):
-        self.base_url = settings.BLOCKCHAIN_SERVICE_URL
-        self.http_client = httpx.AsyncClient(timeout=30.0)  # Longer timeout for blockchain operations
+        # One instance lives on app.state for the whole process, so this pool
+        # keeps connections to the Go service alive across requests
+        self.http_client = httpx.AsyncClient(
+            base_url=settings.BLOCKCHAIN_SERVICE_URL,
+            timeout=httpx.Timeout(30.0, connect=5.0),  # Longer timeout for blockchain operations
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=30, keepalive_expiry=60)
+        )
 
     async def store_contract(
             self,
@@ -38,31 +58,36 @@ class BlockchainService:
     ) -> str:
         """Store a contract in the platform's database"""
 
-        response = await self.http_client.post(
-            f"{self.base_url}/contracts",
-            json={
+        response = await self._request(
+            "POST",
+            "/contracts",
+            idempotent=False,
+            content=orjson.dumps({
                 "owner_id": owner_id,
                 "contract_code": contract_code,
                 "metadata": metadata
-            }
+            }),
+            headers=_JSON_HEADERS
         )
 
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         return data["contract_id"]
 
     async def get_contract(self, contract_id: str) -> Optional[Contract]:
         """Retrieve a contract by its ID"""
 
-        response = await self.http_client.get(
-            f"{self.base_url}/contracts/{contract_id}"
+        response = await self._request(
+            "GET",
+            f"/contracts/{contract_id}",
+            idempotent=True,
         )
 
         if response.status_code == 404:
             return None
 
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         return Contract(**data)
 
     async def list_user_contracts(
@@ -70,11 +95,16 @@ class BlockchainService:
             user_id: str,
             skip: int = 0,
             limit: int = 100
-    ) -> List[Contract]:
-        """List all contracts owned by a specific user"""
-
-        response = await self.http_client.get(
-            f"{self.base_url}/contracts",
+    ) -> List[ContractSummary]:
+        """
+        List all contracts owned by a specific user. The Go service projects
+        out contract_code and deployment_info for list queries.
+        """
+
+        response = await self._request(
+            "GET",
+            "/contracts",
+            idempotent=True,
             params={
                 "owner_id": user_id,
                 "skip": skip,
@@ -83,8 +113,8 @@ class BlockchainService:
         )
 
         response.raise_for_status()
-        data = response.json()
-        return [Contract(**item) for item in data["contracts"]]
+        data = orjson.loads(response.content)
+        return [ContractSummary(**item) for item in data["contracts"]]
 
     async def deploy_contract(
             self,
@@ -93,16 +123,19 @@ class BlockchainService:
     ) -> DeploymentResult:
         """Deploy a contract to the blockchain"""
 
-        response = await self.http_client.post(
-            f"{self.base_url}/deploy",
-            json={
+        response = await self._request(
+            "POST",
+            "/deploy",
+            idempotent=False,
+            content=orjson.dumps({
                 "contract_id": contract_id,
                 "deployer_id": deployer_id
-            }
+            }),
+            headers=_JSON_HEADERS
         )
 
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         return DeploymentResult(**data)
 
     async def verify_contract(
@@ -113,17 +146,20 @@ class BlockchainService:
     ) -> bool:
         """Verify a deployed contract's source code on Etherscan or similar explorer"""
 
-        response = await self.http_client.post(
-            f"{self.base_url}/verify",
-            json={
+        response = await self._request(
+            "POST",
+            "/verify",
+            idempotent=True,
+            content=orjson.dumps({
                 "contract_address": contract_address,
                 "contract_code": contract_code,
                 "constructor_arguments": constructor_arguments
-            }
+            }),
+            headers=_JSON_HEADERS
         )
 
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         return data["verified"]
 
     async def get_contract_library(
@@ -138,13 +174,37 @@ class BlockchainService:
         if category:
             params["category"] = category
 
-        response = await self.http_client.get(
-            f"{self.base_url}/library",
+        response = await self._request(
+            "GET",
+            "/library",
+            idempotent=True,
             params=params
         )
 
         response.raise_for_status()
-        return response.json()
+        return orjson.loads(response.content)
+
+    async def _request(self, method: str, url: str, idempotent: bool, **kwargs: Any) -> httpx.Response:
+        """
+        Send a request, retrying transient failures. Connection failures are
+        retried for any request since it never reached the service; read
+        timeouts and gateway errors only for idempotent ones, so a deploy or
+        store is never repeated.
+        """
+        for attempt in range(1, _MAX_ATTEMPTS + 1):
+            try:
+                response = await self.http_client.request(method, url, **kwargs)
+                if not idempotent or response.status_code not in _RETRYABLE_STATUS_CODES or attempt == _MAX_ATTEMPTS:
+                    return response
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt == _MAX_ATTEMPTS:
+                    raise
+            except httpx.ReadTimeout:
+                if not idempotent or attempt == _MAX_ATTEMPTS:
+                    raise
+
+            wait = min(_RETRY_MAX_WAIT, _RETRY_INITIAL_WAIT * 2 ** (attempt - 1))
+            await asyncio.sleep(wait + random.uniform(0, _RETRY_INITIAL_WAIT))
 
     async def close(self):
         """Close the HTTP client session"""
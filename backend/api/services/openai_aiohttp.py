@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+import aiohttp
+import orjson
+from api.core.config import settings
+from api.services.openai_parallel import is_retryable, retry_delay
+
+OPENAI_CHAT_COMPLETIONS_URL = "https://api.openai.com/v1/chat/completions"
+
+logger = logging.getLogger(__name__)
+
+# The SDK's httpx.AsyncClient loses throughput as concurrency grows, so
+# high-fanout completion calls go straight to the REST API over aiohttp.
+# The session is created lazily because it must be bound to a running loop.
+_session: Optional[aiohttp.ClientSession] = None
+
+def _get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=200, ttl_dns_cache=300, keepalive_timeout=75),
+            # No overall cap: a long completion only sends its body when done
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=5, sock_read=settings.OPENAI_READ_TIMEOUT)
+        )
+    return _session
+
+async def chat_completion(
+        messages: List[Dict[str, Any]],
+        model: str,
+        base_url: str = OPENAI_CHAT_COMPLETIONS_URL,
+        api_key: Optional[str] = None,
+        max_attempts: Optional[int] = None,
+        **kwargs: Any
+) -> Dict[str, Any]:
+    """
+    POST a chat completion request and return the decoded JSON response,
+    shaped like the API's ChatCompletion object. Any other request fields
+    (temperature, response_format, max_tokens, ...) are passed through as-is.
+    `base_url` and `api_key` default to OpenAI; pass both to target another
+    OpenAI-compatible server.
+
+    Rate limits, 5xx responses and connection errors are retried with backoff
+    (honoring Retry-After) up to `max_attempts` times, settings.OPENAI_MAX_ATTEMPTS
+    by default. Callers that retry on their own should pass max_attempts=1.
+    """
+    if api_key is None:
+        api_key = settings.OPENAI_API_KEY
+    if max_attempts is None:
+        max_attempts = settings.OPENAI_MAX_ATTEMPTS
+    data = orjson.dumps({"model": model, "messages": messages, **kwargs})
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+
+    attempt = 1
+    while True:
+        try:
+            async with _get_session().post(base_url, data=data, headers=headers) as response:
+                response.raise_for_status()
+                completion = orjson.loads(await response.read())
+            break
+        except Exception as e:
+            if attempt >= max_attempts or not is_retryable(e):
+                raise
+            delay = retry_delay(e, attempt)
+            logger.warning("chat completion attempt %d failed (%s), retrying in %.1fs", attempt, e, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    usage = completion.get("usage") or {}
+    logger.debug(
+        "chat completion %s: %s prompt tokens, %s served from prompt cache",
+        completion.get("model", model),
+        usage.get("prompt_tokens"),
+        (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+    )
+    return completion
+
+def message_content(completion: Dict[str, Any]) -> str:
+    """Extract the first choice's message content from a chat completion response"""
+    return completion["choices"][0]["message"]["content"]
+
+async def close_session():
+    """Close the shared aiohttp session"""
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
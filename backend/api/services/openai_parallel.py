@@ -0,0 +1,207 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import aiohttp
+import httpx
+import tiktoken
+
+# Statuses worth retrying: rate limited or a transient server-side failure
+_RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# After a 429, hold every worker back for this long before sending again
+_RATE_LIMIT_COOLDOWN = 15.0  # seconds
+
+# Loaded encodings by model name. Failed loads are not cached, so a later
+# batch retries once the BPE file becomes reachable.
+_encodings: Dict[str, tiktoken.Encoding] = {}
+
+def _encoding_for_model(model: str) -> Optional[tiktoken.Encoding]:
+    """
+    The tiktoken encoding for a model, or None if it can't be loaded. The
+    first load downloads the BPE file with blocking I/O, which fails on hosts
+    without egress; call through load_encodings to keep it off the event loop.
+    """
+    encoding = _encodings.get(model)
+    if encoding is not None:
+        return encoding
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+    _encodings[model] = encoding
+    return encoding
+
+async def load_encodings(request_bodies: List[Dict[str, Any]]):
+    """Load the encodings the request bodies need in a worker thread"""
+    loop = asyncio.get_running_loop()
+    for model in {body.get("model", "") for body in request_bodies} - _encodings.keys():
+        await loop.run_in_executor(None, _encoding_for_model, model)
+
+def estimate_request_tokens(body: Dict[str, Any]) -> int:
+    """
+    Estimate the tokens a chat completion request consumes against the
+    tokens-per-minute limit: the prompt plus the requested completion size.
+    Uses only already-loaded encodings and falls back to ~4 characters per
+    token without one.
+    """
+    encoding = _encodings.get(body.get("model", ""))
+    prompt_tokens = 0
+    for message in body.get("messages", []):
+        content = message.get("content") or ""
+        prompt_tokens += 4  # per-message framing
+        prompt_tokens += len(encoding.encode(content)) if encoding is not None else len(content) // 4
+    prompt_tokens += 2  # reply priming
+    return prompt_tokens + body.get("n", 1) * body.get("max_tokens", 1000)
+
+class RateLimiter:
+    """
+    Token buckets for requests and tokens per minute. Capacity refills
+    continuously based on the monotonic clock.
+    """
+
+    def __init__(self, max_requests_per_minute: int, max_tokens_per_minute: int):
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self._available_requests = float(max_requests_per_minute)
+        self._available_tokens = float(max_tokens_per_minute)
+        self._last_update = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_update
+        self._last_update = now
+        self._available_requests = min(
+            self.max_requests_per_minute,
+            self._available_requests + self.max_requests_per_minute * elapsed / 60
+        )
+        self._available_tokens = min(
+            self.max_tokens_per_minute,
+            self._available_tokens + self.max_tokens_per_minute * elapsed / 60
+        )
+
+    async def acquire(self, tokens: int):
+        """Wait until one request and `tokens` tokens are available, then consume them"""
+        # A single request larger than the whole bucket would otherwise wait forever
+        tokens = min(tokens, self.max_tokens_per_minute)
+
+        async with self._lock:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+
+                self._refill()
+                if self._available_requests >= 1 and self._available_tokens >= tokens:
+                    self._available_requests -= 1
+                    self._available_tokens -= tokens
+                    return
+
+                wait_for_request = (1 - self._available_requests) * 60 / self.max_requests_per_minute
+                wait_for_tokens = (tokens - self._available_tokens) * 60 / self.max_tokens_per_minute
+                await asyncio.sleep(max(wait_for_request, wait_for_tokens, 0.001))
+
+    def pause(self, seconds: float):
+        """Stop handing out capacity for a while (e.g. after the API returned 429)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+def _status_code(error: Exception) -> Optional[int]:
+    """HTTP status of a failed request from either aiohttp or httpx"""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code
+    return None
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait via Retry-After(-ms), if it said"""
+    if isinstance(error, aiohttp.ClientResponseError):
+        headers = error.headers or {}
+    elif isinstance(error, httpx.HTTPStatusError):
+        headers = error.response.headers
+    else:
+        return None
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass  # HTTP-date form; fall back to our own backoff
+    return None
+
+def is_retryable(error: Exception) -> bool:
+    """Whether a failed API request is worth sending again"""
+    status_code = _status_code(error)
+    if status_code is not None:
+        return status_code in _RETRYABLE_STATUS_CODES
+    return isinstance(error, (aiohttp.ClientError, httpx.TransportError, asyncio.TimeoutError))
+
+def retry_delay(error: Exception, attempt: int) -> float:
+    """
+    How long to wait before retrying after `attempt` failed: the server's
+    Retry-After when it gave one, otherwise exponential backoff with jitter
+    """
+    retry_after = _retry_after(error)
+    if retry_after is not None:
+        return min(retry_after, 60)
+    return min(2 ** attempt, 60) * random.uniform(0.5, 1.0)
+
+async def run_api_request_processor(
+        request_bodies: List[Dict[str, Any]],
+        send: Callable[[Dict[str, Any]], Awaitable[Any]],
+        max_requests_per_minute: int,
+        max_tokens_per_minute: int,
+        max_attempts: int = 5,
+        max_concurrency: int = 50
+) -> List[Any]:
+    """
+    Dispatch many API requests concurrently while staying under the
+    requests-per-minute and tokens-per-minute limits, retrying transient
+    failures with exponential backoff. Modelled on the openai-cookbook
+    api_request_parallel_processor.
+
+    Returns one entry per request body, in submission order: the result of
+    `send`, or the exception from its final attempt.
+    """
+    limiter = RateLimiter(max_requests_per_minute, max_tokens_per_minute)
+    results: List[Any] = [None] * len(request_bodies)
+    queue: "asyncio.Queue[Tuple[int, int]]" = asyncio.Queue()
+    await load_encodings(request_bodies)
+    token_estimates = [estimate_request_tokens(body) for body in request_bodies]
+
+    for index in range(len(request_bodies)):
+        queue.put_nowait((index, 1))
+
+    async def worker():
+        while True:
+            index, attempt = await queue.get()
+            try:
+                await limiter.acquire(token_estimates[index])
+                results[index] = await send(request_bodies[index])
+            except Exception as e:
+                if attempt >= max_attempts or not is_retryable(e):
+                    results[index] = e
+                    continue
+
+                if _status_code(e) == 429:
+                    limiter.pause(_RATE_LIMIT_COOLDOWN)
+                # Back off (or wait as told by Retry-After), then back into the queue
+                await asyncio.sleep(retry_delay(e, attempt))
+                queue.put_nowait((index, attempt + 1))
+            finally:
+                queue.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(max_concurrency, len(request_bodies)))]
+    try:
+        await queue.join()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    return results
@@ -1,20 +1,62 @@
-from typing import Dict, Any, List
-import json
+import hashlib
+import io
+from typing import Dict, Any, List, Tuple
+import orjson
 from pydantic import BaseModel
-from api.services.ai_service import ContractStructure
-import openai
 from api.core.config import settings
+from api.core.ttl_cache import TTLCache
+from api.services.ai_cache import cache_key, get_or_compute
+from api.services.ai_service import ContractStructure
+from api.services.openai_aiohttp import chat_completion, message_content
+
+# Flowchart and sequence output is a pure function of the structure, so it is
+# memoized by (type, structure digest) -> orjson-encoded visualization
+_VISUALIZATION_CACHE_MAX_SIZE = 1024
+_visualization_cache: "TTLCache[bytes, bytes]" = TTLCache(_VISUALIZATION_CACHE_MAX_SIZE)
+
+# Horizontal distance of flowchart function nodes from the contract node
+_FUNCTION_COLUMN_OFFSET = 200
+
+class _UnusableScenarios(Exception):
+    """The model's interaction scenarios could not be parsed"""
+
+def _visualization_cache_key(
+        contract_structure: ContractStructure,
+        visualization_type: str,
+        include_mermaid: bool
+) -> bytes:
+    digest = hashlib.blake2b(f"{visualization_type}:{include_mermaid:d}".encode(), digest_size=16)
+    digest.update(orjson.dumps(contract_structure.dict(), option=orjson.OPT_SORT_KEYS))
+    return digest.digest()
+
+def _event_links(functions: List[Dict[str, Any]], events: List[Dict[str, Any]]) -> List[Tuple[int, int]]:
+    """
+    (function index, event index) pairs where the function's description
+    mentions the event, ordered by function then event. Each description
+    and event name is lowercased once.
+    """
+    descriptions = [func.get("description", "").lower() for func in functions]
+    # Descriptions used to be split on "." before matching, so a name
+    # containing a dot can never match
+    event_names = [
+        (i, name) for i, name in enumerate(event["name"].lower() for event in events)
+        if "." not in name
+    ]
+    return [
+        (func_index, event_index)
+        for func_index, description in enumerate(descriptions)
+        for event_index, name in event_names
+        if name in description
+    ]
 
 class VisualizationService:
     """Service for generating visualizations of smart contracts"""
 
-    def __init__(self):
-        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-
-    def generate_visualization(
+    async def generate_visualization(
             self,
             contract_structure: ContractStructure,
-            visualization_type: str = "flowchart"
+            visualization_type: str = "flowchart",
+            include_mermaid: bool = False
     ) -> Dict[str, Any]:
         """
         Generate visualization data based on contract structure
@@ -22,21 +64,33 @@ class VisualizationService:
         Args:
             contract_structure: Parsed structure of the smart contract
             visualization_type: Type of visualization to generate (flowchart, sequence, etc.)
+            include_mermaid: Also return Mermaid source for flowcharts and sequence
+                diagrams; by default the frontend renders from the structured data
 
         Returns:
             Dictionary with visualization data that can be rendered on the frontend
         """
-        if visualization_type == "flowchart":
-            return self._generate_flowchart(contract_structure)
-        elif visualization_type == "sequence":
-            return self._generate_sequence_diagram(contract_structure)
-        elif visualization_type == "interaction":
-            return self._generate_interaction_diagram(contract_structure)
-        else:
+        if visualization_type == "interaction":
+            # The AI-generated part is cached separately in _generate_user_interactions
+            return await self._generate_interaction_diagram(contract_structure)
+        if visualization_type != "sequence":
             # Default to flowchart
-            return self._generate_flowchart(contract_structure)
+            visualization_type = "flowchart"
+
+        key = _visualization_cache_key(contract_structure, visualization_type, include_mermaid)
+        cached = _visualization_cache.get(key)
+        if cached is not None:
+            return orjson.loads(cached)
+
+        if visualization_type == "sequence":
+            visualization = self._generate_sequence_diagram(contract_structure, include_mermaid)
+        else:
+            visualization = self._generate_flowchart(contract_structure, include_mermaid)
+
+        _visualization_cache.set(key, orjson.dumps(visualization))
+        return visualization
 
-    def _generate_flowchart(self, contract_structure: ContractStructure) -> Dict[str, Any]:
+    def _generate_flowchart(self, contract_structure: ContractStructure, include_mermaid: bool) -> Dict[str, Any]:
         """Generate a flowchart visualization of the contract"""
 
         # Extract key components for visualization
@@ -58,13 +112,9 @@ class VisualizationService:
             "position": {"x": 0, "y": 0}
         })
 
-        # Function nodes
+        # Function nodes, in two columns either side of the contract
         for i, func in enumerate(functions):
-            angle = (2 * 3.14159 * i) / len(functions) if functions else 0
-            radius = 200
-
-            # Simple positioning in a circle around the contract
-            x = radius * (i % 2 * 2 - 1)  # Alternate left and right
+            x = _FUNCTION_COLUMN_OFFSET * (i % 2 * 2 - 1)  # Alternate left and right
             y = 100 + 80 * (i // 2)  # Stack vertically with spacing
 
             nodes.append({
@@ -94,31 +144,30 @@ class VisualizationService:
             })
 
         # Connect functions to events they emit
-        for func in functions:
-            func_name = func["name"]
-            # This is a simplification - in a real system, you'd analyze the function code
-            # to determine which events it emits
-            for event in events:
-                event_name = event["name"]
-                if any(event_name.lower() in line.lower() for line in func.get("description", "").split(".")):
-                    edges.append({
-                        "id": f"edge_{func_name}_to_{event_name}",
-                        "source": f"function_{func_name}",
-                        "target": f"event_{event_name}",
-                        "type": "event_emission"
-                    })
-
-        # Generate Mermaid flowchart syntax
-        mermaid_code = self._generate_mermaid_flowchart(contract_structure)
+        # This is a simplification - in a real system, you'd analyze the function code
+        # to determine which events it emits
+        event_links = _event_links(functions, events)
+        for func_index, event_index in event_links:
+            func_name = functions[func_index]["name"]
+            event_name = events[event_index]["name"]
+            edges.append({
+                "id": f"edge_{func_name}_to_{event_name}",
+                "source": f"function_{func_name}",
+                "target": f"event_{event_name}",
+                "type": "event_emission"
+            })
 
-        return {
+        flowchart = {
             "type": "flowchart",
             "nodes": nodes,
-            "edges": edges,
-            "mermaid": mermaid_code
+            "edges": edges
         }
+        if include_mermaid:
+            # Generate Mermaid flowchart syntax
+            flowchart["mermaid"] = self._generate_mermaid_flowchart(contract_structure, event_links)
+        return flowchart
 
-    def _generate_sequence_diagram(self, contract_structure: ContractStructure) -> Dict[str, Any]:
+    def _generate_sequence_diagram(self, contract_structure: ContractStructure, include_mermaid: bool) -> Dict[str, Any]:
         """Generate a sequence diagram visualization showing the typical flow of contract execution"""
 
         # For the sequence diagram, we'll generate a Mermaid diagram that shows
@@ -138,22 +187,22 @@ class VisualizationService:
             # If no explicit data flow, create a simple one based on functions
             data_flow = [f"User calls {func['name']}" for func in main_functions[:3]]
 
-        # Convert to mermaid syntax
-        mermaid_code = self._generate_mermaid_sequence(
-            actors=actors,
-            contract_name=contract_name,
-            data_flow=data_flow,
-            functions=main_functions
-        )
-
-        return {
+        sequence = {
             "type": "sequence",
             "actors": actors,
-            "interactions": data_flow,
-            "mermaid": mermaid_code
+            "interactions": data_flow
         }
-
-    def _generate_interaction_diagram(self, contract_structure: ContractStructure) -> Dict[str, Any]:
+        if include_mermaid:
+            # Convert to mermaid syntax
+            sequence["mermaid"] = self._generate_mermaid_sequence(
+                actors=actors,
+                contract_name=contract_name,
+                data_flow=data_flow,
+                functions=main_functions
+            )
+        return sequence
+
+    async def _generate_interaction_diagram(self, contract_structure: ContractStructure) -> Dict[str, Any]:
         """Generate an interactive diagram showing how users can interact with the contract"""
 
         # This would be a more complex diagram showing the possible user interactions
@@ -161,7 +210,7 @@ class VisualizationService:
         functions = contract_structure.functions
 
         # Use AI to generate potential user stories/interactions
-        user_interactions = self._generate_user_interactions(contract_structure)
+        user_interactions = await self._generate_user_interactions(contract_structure)
 
         # Generate visualization data
         return {
@@ -171,17 +220,22 @@ class VisualizationService:
             "functions": [f["name"] for f in functions if f.get("visibility") in ["public", "external"]]
         }
 
-    def _generate_mermaid_flowchart(self, contract_structure: ContractStructure) -> str:
+    def _generate_mermaid_flowchart(
+            self,
+            contract_structure: ContractStructure,
+            event_links: List[Tuple[int, int]]
+    ) -> str:
         """Generate Mermaid syntax for a flowchart diagram"""
 
         contract_name = contract_structure.summary.get("contractName", "Contract")
         functions = contract_structure.functions
         events = contract_structure.events
 
-        mermaid_lines = [
-            "flowchart TD",
-            f"    Contract[{contract_name}]"
-        ]
+        # Lines are written with a leading newline so the output has no trailing one
+        buffer = io.StringIO()
+        w = buffer.write
+        w("flowchart TD")
+        w(f"\n    Contract[{contract_name}]")
 
         # Add function nodes
         for func in functions:
@@ -196,20 +250,24 @@ class VisualizationService:
             # Add modifiers as text if present
             modifier_display = f"\\n{modifier_text}" if modifier_text else ""
 
-            mermaid_lines.append(f"    {func_name}{shape}{func_name}{modifier_display}{end_shape}")
-            mermaid_lines.append(f"    Contract --> {func_name}")
+            w(f"\n    {func_name}{shape}{func_name}{modifier_display}{end_shape}")
+            w(f"\n    Contract --> {func_name}")
+
+        # Functions linked to each event, in function order
+        linked_functions: Dict[int, List[str]] = {}
+        for func_index, event_index in event_links:
+            linked_functions.setdefault(event_index, []).append(functions[func_index]["name"])
 
         # Add event nodes
-        for event in events:
+        for event_index, event in enumerate(events):
             event_name = event["name"]
-            mermaid_lines.append(f"    Event_{event_name}[/{event_name}/]")
+            w(f"\n    Event_{event_name}[/{event_name}/]")
 
             # Connect functions to events (simplified)
-            for func in functions:
-                if any(event_name.lower() in line.lower() for line in func.get("description", "").split(".")):
-                    mermaid_lines.append(f"    {func['name']} -.-> Event_{event_name}")
+            for func_name in linked_functions.get(event_index, ()):
+                w(f"\n    {func_name} -.-> Event_{event_name}")
 
-        return "\n".join(mermaid_lines)
+        return buffer.getvalue()
 
     def _generate_mermaid_sequence(
             self,
@@ -220,12 +278,11 @@ class VisualizationService:
     ) -> str:
         """Generate Mermaid syntax for a sequence diagram"""
 
-        mermaid_lines = [
-            "sequenceDiagram",
-            "    participant U as User",
-            f"    participant C as {contract_name}",
-            "    participant B as Blockchain"
-        ]
+        buffer = io.StringIO()
+        w = buffer.write
+        w("sequenceDiagram\n    participant U as User")
+        w(f"\n    participant C as {contract_name}")
+        w("\n    participant B as Blockchain")
 
         # Add sequence based on data flow
         for i, step in enumerate(data_flow):
@@ -235,35 +292,36 @@ class VisualizationService:
                 # User calling contract function
                 for func in functions:
                     if func["name"].lower() in step_lower:
-                        mermaid_lines.append(f"    U->>C: {func['name']}()")
+                        w(f"\n    U->>C: {func['name']}()")
 
                         # If function modifies state, show interaction with blockchain
                         if any(mod in ["payable", "nonReentrant"] for mod in func.get("modifiers", [])):
-                            mermaid_lines.append(f"    C->>B: Update state")
-                            mermaid_lines.append(f"    B-->>C: Confirmation")
+                            w("\n    C->>B: Update state")
+                            w("\n    B-->>C: Confirmation")
 
                         # Show return to user
-                        mermaid_lines.append(f"    C-->>U: Return result")
+                        w("\n    C-->>U: Return result")
                         break
             elif "emit" in step_lower or "event" in step_lower:
                 # Contract emitting an event
-                mermaid_lines.append(f"    C->>B: Emit event")
+                w("\n    C->>B: Emit event")
             elif "check" in step_lower or "verify" in step_lower:
                 # Contract checking something
-                mermaid_lines.append(f"    C->>C: Internal validation")
+                w("\n    C->>C: Internal validation")
             else:
                 # Generic interaction if we can't determine the type
-                mermaid_lines.append(f"    U->>C: Interaction {i+1}")
-                mermaid_lines.append(f"    C-->>U: Response")
+                w(f"\n    U->>C: Interaction {i+1}")
+                w("\n    C-->>U: Response")
 
-        return "\n".join(mermaid_lines)
+        return buffer.getvalue()
 
-    def _generate_user_interactions(self, contract_structure: ContractStructure) -> List[Dict[str, Any]]:
+    async def _generate_user_interactions(self, contract_structure: ContractStructure) -> List[Dict[str, Any]]:
         """
-        Use the AI to generate realistic user interaction scenarios with the contract
+        Use the AI to generate realistic user interaction scenarios with the contract.
+        Scenarios are cached per prompt, so an unchanged structure reuses them.
         """
-        contract_summary = json.dumps(contract_structure.summary)
-        functions_json = json.dumps([
+        contract_summary = orjson.dumps(contract_structure.summary).decode()
+        functions_json = orjson.dumps([
             {
                 "name": f["name"],
                 "visibility": f.get("visibility", ""),
@@ -273,42 +331,49 @@ class VisualizationService:
             }
             for f in contract_structure.functions
             if f.get("visibility") in ["public", "external"]
-        ])
+        ]).decode()
 
         prompt = f"""
-        Based on this smart contract structure, generate 3-5 typical user interaction scenarios.
+        Based on the smart contract structure below, generate 3-5 typical user interaction scenarios.
         Each scenario should represent a realistic way a user might interact with this contract.
         
-        Contract summary: {contract_summary}
-        
-        Available public/external functions:
-        {functions_json}
-        
         For each scenario, provide:
         1. A name for the scenario
         2. A brief description of what the user is trying to achieve
         3. A sequence of 2-5 steps showing the interactions with the contract
         
         Format your response as a JSON array of scenarios.
+        
+        Contract summary: {contract_summary}
+        
+        Available public/external functions:
+        {functions_json}
         """
 
-        response = self.client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert in blockchain user experience design, specializing in creating intuitive interaction flows for smart contracts."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.7  # Slightly higher temperature for creative scenarios
-        )
+        async def compute() -> List[Dict[str, Any]]:
+            response = await chat_completion(
+                model=settings.OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": "You are an expert in blockchain user experience design, specializing in creating intuitive interaction flows for smart contracts."},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.7  # Slightly higher temperature for creative scenarios
+            )
+
+            try:
+                result = orjson.loads(message_content(response))
+                scenarios = result.get("scenarios", [])
+                if not scenarios:
+                    # If the AI didn't use the expected format, use the whole response
+                    scenarios = result
+                return scenarios
+            except Exception as e:
+                raise _UnusableScenarios() from e
 
         try:
-            scenarios = json.loads(response.choices[0].message.content).get("scenarios", [])
-            if not scenarios:
-                # If the AI didn't use the expected format, try to parse the whole response
-                scenarios = json.loads(response.choices[0].message.content)
-            return scenarios
-        except Exception as e:
+            return await get_or_compute(cache_key("user_interactions", prompt), compute)
+        except _UnusableScenarios:
             # Return a simple default scenario if parsing fails
             return [{
                 "name": "Basic Interaction",
@@ -30,6 +30,18 @@ type Contract struct {
 	DeploymentInfo  map[string]interface{} `bson:"deployment_info,omitempty" json:"deployment_info,omitempty"`
 }
 
+// ContractSummary is a contract as returned by list queries, without the
+// fields listProjection leaves out
+type ContractSummary struct {
+	ID              string                 `bson:"_id" json:"id"`
+	OwnerID         string                 `bson:"owner_id" json:"owner_id"`
+	Metadata        map[string]interface{} `bson:"metadata" json:"metadata"`
+	CreatedAt       time.Time              `bson:"created_at" json:"created_at"`
+	UpdatedAt       time.Time              `bson:"updated_at" json:"updated_at"`
+	IsPublic        bool                   `bson:"is_public" json:"is_public"`
+	DeployedAddress string                 `bson:"deployed_address,omitempty" json:"deployed_address,omitempty"`
+}
+
 // DeploymentRequest represents a request to deploy a contract
 type DeploymentRequest struct {
 	ContractID  string `json:"contract_id"`
@@ -47,6 +59,9 @@ type DeploymentResponse struct {
 	BlockNumber    int     `json:"block_number"`
 }
 
+// listProjection drops the large per-contract fields that list responses never expose
+var listProjection = bson.M{"contract_code": 0, "deployment_info": 0, "audit_results": 0}
+
 // Service handles contract operations
 type Service struct {
 	contracts *mongo.Collection
@@ -147,6 +162,7 @@ func (s *Service) ListContracts(c *gin.Context) {
 	findOptions.SetSkip(int64(skip))
 	findOptions.SetLimit(int64(limit))
 	findOptions.SetSort(bson.M{"created_at": -1}) // Sort by creation time, newest first
+	findOptions.SetProjection(listProjection)
 
 	// Execute the query
 	cursor, err := s.contracts.Find(ctx, filter, findOptions)
@@ -157,7 +173,7 @@ func (s *Service) ListContracts(c *gin.Context) {
 	defer cursor.Close(ctx)
 
 	// Decode the results
-	var contracts []Contract
+	var contracts []ContractSummary
 	if err := cursor.All(ctx, &contracts); err != nil {
 		c.JSON(http.StatusInternalServerError, gin.H{"error": "Failed to decode contracts"})
 		return